@@ -24,10 +24,11 @@ Commandline inputs: 1) directory which contains .pdb files for processing
 # Import libraries
 
 # sys to take args from commandline, os for reading directory, subprocess for running external program, pandas
-# for making dataframes
+# for making dataframes, concurrent.futures for running the external program on several files at once
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
 
@@ -50,47 +51,51 @@ def get_pdbdirectory():
 
 # *************************************************************************
 def read_directory_for_pdb_files(pdb_direct):
-    """Return a list of all files that are PDB files in the called directory
+    """Return the name and the full filepath of all files that are PDB files in the called directory
 
     Input:  pdb_direct   --- Directory of PBD files that will be processed for VH-VL packing angles
-    Return: files        --- All PDB files in the directory
-
+    Return: files        --- Name and path of all PDB files in the directory
+    e.g. [('5DMG_2', '/Users/v/Desktop/git/VH_VL_Pack/some_pdbs/5DMG_2.pdb'),
+     ('5DQ9_3', '/Users/v/Desktop/git/VH_VL_Pack/some_pdbs/5DQ9_3.pdb')]
 
     15.03.2021  Original   By: VAB
     """
 
-    # Creates an empty list, then iterates over all files in the directory called from the
-    # commandline. Adds all these .pdb files to the list.
-    files = []
-    for file in os.listdir(pdb_direct):
-        if file.endswith(".pdb") or file.endswith(".ent"):
-            files.append('{}/{}'.format(pdb_direct, file))
+    # Walks the directory called from the commandline once, keeping all .pdb and .ent files together with their
+    # name without the extension, so the names do not need a second pass over the directory
+    with os.scandir(pdb_direct) as entries:
+        files = [(os.path.splitext(entry.name)[0], entry.path) for entry in entries
+                 if entry.name.endswith((".pdb", ".ent"))]
     return files
 
 
 # *************************************************************************
-def extract_pdb_name(pdb_direct):
-    """Print a list of headers of PDB files in the called directory
+def calc_packing_angle(pdb_file, pdb_code):
+    """Run 'abpackingangle' on a single PDB file and return the pdb name followed by the VH-VL packing angle
 
-    Input:  pdb_direct   --- Directory of PBD files that will be processed for VH-VL packing angles
-    Return: pdb_name     --- Names of all PDB files in the directory
+        Input:  pdb_file          --- PDB file to process
+                pdb_code          --- Name of the PDB file
+        Return: angle_result      --- Line containing the angle for the pdb code, or None if abpackingangle failed
+            e.g. '3U0T_1: -35.507964'
 
+        15.10.2026  Original   By: agent
+        """
 
-    18.03.2021  Original   By: VAB
-    """
+    # Uses the subprocess module to call abpackingangle and inputs the header/.pdb file
+    # into the program as arguments
+    try:
+        angle_result = subprocess.check_output(['abpackingangle', '-p', pdb_code, '-q', pdb_file])
 
-    # Iternates over all files in directory, checks if they are pdb files and returns the
-    # name without the extension into a list.
-    pdb_names = []
-    for pdb in os.listdir(pdb_direct):
-        if pdb.endswith(".pdb") or pdb.endswith(".ent"):
-            pdb_name = os.path.splitext(pdb)[0]
-            pdb_names.append(pdb_name)
-    return pdb_names
+    # bypasses any files that raise an error and the abpackingangle cannot run
+    except subprocess.CalledProcessError:
+        return None
+
+    # Converts the output of the subprocess into normal string
+    return str(angle_result, 'utf-8')
 
 
 # *************************************************************************
-def run_abpackingangle(pdb_files, generate_pdb_names):
+def run_abpackingangle(files):
     """Run 'abpackingangle' on all files in directory by using the header and .pdb outputs produced and output the
     pdb name followed by the VH-VL packing angle
     e.g.
@@ -100,29 +105,23 @@ def run_abpackingangle(pdb_files, generate_pdb_names):
     5WKO_4: -43.998193
     3U0T_1: -35.507964
 
-        Input:  pdb_files         --- All PDB files in the directory
-                pdb_name          --- Names of all PDB files in the directory
+        Input:  files             --- Names and paths of all PDB files in the directory
         Return: angle_results     --- List of angles corresponding to pdb codes
             e.g. ['3U0T_1: -35.507964', '5V6M_1: -41.396929', ...]
 
         19.03.2021  Original   By: VAB
         """
-    angle_results = []
-
-    # Takes the two lists made in files and combines them into lists of tuples that have
-    # the name linked to the file.
-    for pdb_file, pdb_code in zip(pdb_files, generate_pdb_names):
-
-        # Uses the subprocess module to call abpackingangle and inputs the headers/.pdb lists
-        # into the program as arguments
-        try:
-            angle_result = subprocess.check_output(['abpackingangle', '-p', pdb_code, '-q', pdb_file])
-
-        # bypasses any files that raise an error and the abpackingangle cannot run
-        except subprocess.CalledProcessError:
-            continue
-        # Converts the output of the subprocess into normal string
-        angle_results.append(str(angle_result, 'utf-8'))
+
+    pdb_names = [pdb_name for pdb_name, pdb_file in files]
+    pdb_files = [pdb_file for pdb_name, pdb_file in files]
+
+    # Each call to abpackingangle is independent, so they are run side by side. The threads only wait on the
+    # external program, and map() hands the results back in the same order as the files.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        angle_results = executor.map(calc_packing_angle, pdb_files, pdb_names)
+
+        # Files that abpackingangle could not run on are left out
+        angle_results = [angle_result for angle_result in angle_results if angle_result is not None]
     return angle_results
 
 
@@ -151,7 +150,7 @@ def convert_to_csv(angles):
     # make table that will contain the pdb and the angle in a csv format
     atable = pd.DataFrame(data=table, columns=c)
     try:
-        atable = atable[atable['angle'].str.contains('Packing angle') == False]
+        atable = atable[atable['angle'].str.contains('Packing angle', regex=False) == False]
     except:
         print('No missing angles.')
     return atable
@@ -165,9 +164,7 @@ pdb_directory = get_pdbdirectory()
 
 all_pdb_files = read_directory_for_pdb_files(pdb_directory)
 
-all_pdb_names = extract_pdb_name(pdb_directory)
-
-calculate_angles = run_abpackingangle(all_pdb_files, all_pdb_names)
+calculate_angles = run_abpackingangle(all_pdb_files)
 
 produce_csv = convert_to_csv(calculate_angles)
 produce_csv.to_csv('{}.csv'.format(sys.argv[2]), index=False)
@@ -35,6 +35,55 @@ import pandas as pd
 import numpy as np
 
 
+# *************************************************************************
+# Residue features used for the 4d encoding
+
+# 1. total number of side-chain atoms
+nr_side_chain_atoms_dic = {'A': 1, 'R': 7, "N": 4, "D": 4, "C": 2, "Q": 5, "E": 5, "G": 0, "H": 6, "I": 4,
+                           "L": 4, "K": 15, "M": 4, "F": 7, "P": 4,
+                           "S": 2, "T": 3, "W": 10, "Y": 8, "V": 3, "X": 10.375}  # "X": 10.375
+
+# 2. number of side-chain atoms in shortest path from Calpha to most distal atom
+compactness_dic = {'A': 1, 'R': 6, "N": 3, "D": 3, "C": 2, "Q": 4, "E": 4, "G": 0, "H": 4, "I": 3,
+                   "L": 3, "K": 6, "M": 4, "F": 5, "P": 2,
+                   "S": 2, "T": 2, "W": 6, "Y": 6, "V": 2, "X": 4.45}  # , "X": 4.45
+
+# 3. eisenberg consensus hydrophobicity
+# Consensus values: Eisenberg, et al 'Faraday Symp.Chem.Soc'17(1982)109
+Hydrophathy_index = {'A': 00.250, 'R': -1.800, "N": -0.640, "D": -0.720, "C": 00.040, "Q": -0.690, "E": -0.620,
+                     "G": 00.160, "H": -0.400, "I": 00.730, "L": 00.530, "K": -1.100, "M": 00.260, "F": 00.610,
+                     "P": -0.070,
+                     "S": -0.260, "T": -0.180, "W": 00.370, "Y": 00.020, "V": 00.540, "X": -0.5}  # -0.5 is average
+
+# 4. charge (histidine was assigned +0.5), all other residues are neutral
+charge_dic = {"D": -1, "K": 1, "R": 1, 'E': -1, 'H': 0.5}
+
+
+# *************************************************************************
+def make_lut(dics, defaults):
+    """Turn residue dictionaries into a table that can be indexed by the character code of the residue
+
+    Input:  dics        --- Dictionaries of one-letter residue codes and their feature value, one per feature
+            defaults    --- Values given to residues that are not in each dictionary
+    Return: lut         --- Array of 128 rows, one for each ASCII character, and one column per feature
+
+    15.10.2026  Original   By: agent
+    """
+
+    # Single precision is more than enough for the feature values and halves the size of the encoded tables
+    lut = np.empty((128, len(dics)), dtype=np.float32)
+    for column, (dic, default) in enumerate(zip(dics, defaults)):
+        lut[:, column] = default
+        for res, value in dic.items():
+            lut[ord(res), column] = value
+    return lut
+
+
+# Lookup table is built once in the order of the encoded columns (charge, side chain atoms, compactness,
+# hydrophobicity); unknown residues have no value except for charge, which is neutral
+res_features_lut = make_lut([charge_dic, nr_side_chain_atoms_dic, compactness_dic, Hydrophathy_index],
+                            [0, np.nan, np.nan, np.nan])
+
 
 # *************************************************************************
 def read_csv():
@@ -48,48 +97,34 @@ def read_csv():
     # The column names contained in the .csv file
     col1 = ['code', 'L/H position', 'residue']
 
+    # Pdb codes and positions repeat on many rows, so they are read as categories (small integer codes) that are
+    # quick to group by
+    col_types = {'code': 'category', 'L/H position': 'category', 'residue': 'object'}
+
     # Take the commandline input as the .csv file with L/H residue positions
     if sys.argv[1] != '':
-        res_file = pd.read_csv(sys.argv[1], usecols=col1)
+        res_file = pd.read_csv(sys.argv[1], usecols=col1, dtype=col_types)
 
     return res_file
 
 
 # *************************************************************************
-def make_res_seq(rfile):
-    """Take all individual residue identities for a pdb file and combine them into a single sequence for
-    each individual pdb
+def read_angles():
+    """Read the file containing the packing angle of each pdb file
 
-    Input:  rfile       --- Dataframe containing residue identities for VHVL region
-    Return: seq_df      --- Dataframe containing the pdb code and the sequence of VHVL residues for each pdb
-    e.g.
-        code        residue
-0     12E8_1  QPGPLFYELVKYQ
-1     12E8_2  QPGPLFYELVKYQ
-2     15C8_1  QPGPLYYELDKYQ
+    Return: angle_file      --- Table of pdb codes and their packing angles, indexed by pdb code
 
-    10.04.2021  Original   By: VAB
+    15.10.2026  Original   By: agent
     """
 
-    # Add all items under the 'residue' column into one field
-    aggregation_func = {'residue': 'sum'}
-
-    # Group rows  by pdb code and then combine them into one field
-    #         residue
-    # code
-    # 12E8_1  QPGPLFYELVKYQ
-    # 12E8_2  QPGPLFYELVKYQ
-
-    seq_df = rfile.groupby(rfile['code']).aggregate(aggregation_func)
+    # The column names contained in the .csv file
+    col1 = ['code', 'angle']
 
-    # Reset the indices back to single row of column names for easier manipulation:
-    #         code        residue
-    # 0     12E8_1  QPGPLFYELVKYQ
-    # 1     12E8_2  QPGPLFYELVKYQ
+    # Take the second input from the commandline (which will be the table of pdb codes and their packing angles)
+    if sys.argv[2] != '':
+        angle_file = pd.read_csv(sys.argv[2], usecols=col1, index_col='code')
 
-    seq_df = seq_df.reset_index()
-    # seq_df.reset_index()['residue']
-    return seq_df
+    return angle_file
 
 
 # *************************************************************************
@@ -110,69 +145,27 @@ def encode(table):
     10.04.2021  V2.0       By: VAB
     """
 
-    columns = ['code', "res_charge", "res_sc_nr", "res_compactness", "res_hydrophob"]
-    seq_df = pd.DataFrame(columns=columns)
-
-    # Iterate through all rows in the datatable as sets of tuples
-    for row in table.itertuples():
-        seq = row[2]
-        for res in seq:
-            code = row[1]
-            charge_of_res = charge(res)
-            hydrophobicity_res = hydophobicity(res)
-            compactness_res = compactness(res)
-            nr_side_chain_atoms_res = nr_side_chain_atoms(res)
-
-            seq_df = seq_df.append(
-                {'code': code, "res_charge": charge_of_res, "res_sc_nr": nr_side_chain_atoms_res,
-                 "res_compactness": compactness_res, "res_hydrophob": hydrophobicity_res}, ignore_index=True)
-    return seq_df
-
-
-def nr_side_chain_atoms(resi):
-    # 1. total number of side-chain atoms
-    nr_side_chain_atoms_dic = {'A': 1, 'R': 7, "N": 4, "D": 4, "C": 2, "Q": 5, "E": 5, "G": 0, "H": 6, "I": 4,
-                               "L": 4, "K": 15, "M": 4, "F": 7, "P": 4,
-                               "S": 2, "T": 3, "W": 10, "Y": 8, "V": 3, "X": 10.375}  # "X": 10.375
-    nr_side_chain_atoms = nr_side_chain_atoms_dic[resi]
-    return nr_side_chain_atoms
-
-
-def compactness(resi):
-    # 2. number of side-chain atoms in shortest path from Calpha to most distal atom
-    compactness_dic = {'A': 1, 'R': 6, "N": 3, "D": 3, "C": 2, "Q": 4, "E": 4, "G": 0, "H": 4, "I": 3,
-                       "L": 3, "K": 6, "M": 4, "F": 5, "P": 2,
-                       "S": 2, "T": 2, "W": 6, "Y": 6, "V": 2, "X": 4.45}  # , "X": 4.45
-    compactness = compactness_dic[resi]
-    return compactness
-
+    columns = ["res_charge", "res_sc_nr", "res_compactness", "res_hydrophob"]
 
-def hydophobicity(resi):
-    # 3. eisenberg consensus hydrophobicity
-    # Consensus values: Eisenberg, et al 'Faraday Symp.Chem.Soc'17(1982)109
-    Hydrophathy_index = {'A': 00.250, 'R': -1.800, "N": -0.640, "D": -0.720, "C": 00.040, "Q": -0.690, "E": -0.620,
-                         "G": 00.160, "H": -0.400, "I": 00.730, "L": 00.530, "K": -1.100, "M": 00.260, "F": 00.610,
-                         "P": -0.070,
-                         "S": -0.260, "T": -0.180, "W": 00.370, "Y": 00.020, "V": 00.540, "X": -0.5}  # -0.5 is average
+    # Use the character code of each residue to index the lookup table, gathering all four features of a
+    # residue in one step
+    residues = table['residue'].to_numpy(dtype='U1')
+    res_index = residues.view(np.uint32)
+    seq_df = pd.DataFrame(res_features_lut[res_index], columns=columns)
 
-    hydrophobicity = Hydrophathy_index[resi]
-    return hydrophobicity
-
-
-def charge(resi):
-    dic = {"D": -1, "K": 1, "R": 1, 'E': -1, 'H': 0.5}
-    charge = 0
-    if resi in dic:
-        charge += dic[resi]
-    return charge
+    # The pdb code and position of every residue are kept so the encoding can be reshaped by position
+    seq_df.insert(0, 'code', table['code'].array)
+    seq_df.insert(1, 'L/H position', table['L/H position'].array)
+    return seq_df
 
 
 # *************************************************************************
-def combine_by_pdb_code(table):
-    """Take all individual residue identities for a pdb file and combine them into a single sequence for
+def combine_by_pdb_code(table, angle_file):
+    """Take all individual encoded residues for a pdb file and combine them into a single row for
     each individual pdb
 
-    Input:  table            --- Data frame containing the residue sequence for each pdb
+    Input:  table            --- Data frame containing the encoded residue at each position for each pdb
+            angle_file       --- Table of pdb codes and their packing angles
     Return: training_df      --- Dataframe containing the pdb code, all encoded residues and the packing angle
     e.g.
         code L38a L38b L38c   L38d L40a  ...  H91d H105a H105b H105c  H105d angle
@@ -182,72 +175,33 @@ def combine_by_pdb_code(table):
     10.04.2021  Original   By: VAB
     """
 
-    col = ['code', 'encoded_res']
-    itable = []
-    for row in table.itertuples():
-        code = row[1]
-
-        # charge
-        a = row[2]
-
-        # side chain number
-        b = row[3]
-
-        # compactness
-        c = row[4]
+    # Each encoded feature becomes one column per position, with the letter marking the feature, e.g. L38a
+    features = {'res_charge': 'a', 'res_sc_nr': 'b', 'res_compactness': 'c', 'res_hydrophob': 'd'}
 
-        # hydrophobicity
-        d = row[5]
+    # Reshape so that each pdb file is a single row and every position/feature pair is a column
+    res_df = table.pivot(index='code', columns='L/H position', values=list(features))
+    res_df.columns = ['{}{}'.format(position, features[feature]) for feature, position in res_df.columns]
 
-        # the last comma and space had to be added to avoid deletion of of the first vector of each added residue
-        res_encoded = '{}, {}, {}, {}, '.format(a, b, c, d)
-        res = [code, res_encoded]
-        itable.append(res)
-
-    temp_df = pd.DataFrame(data=itable, columns=col)
-
-    # Combine all of the encoded residues for a specific pdb file into a single row
-    enc_df = temp_df.groupby(temp_df['code']).aggregate(np.sum)
-    enc_df = enc_df.reset_index()
-
-    # Re-make pdb codes as a single column
-    pdb_code_df = pd.Series(enc_df.code, name='code')
-
-    # Split combined codes into separate fields with the position and parameter as the column name
-    # ('trash' column created because the adjustment above that corrects data removal
-    # ends up creating a blank column)
+    # Put the encoded columns in the order given by the .dat file
     col2 = []
     for i in open(sys.argv[3]).readlines():
         i = i.strip('\n')
         col2.append(i)
 
     col2.remove('code')
-    col2.append('trash')
     col2.remove('angle')
-    print(col2)
-
-    res_df = pd.DataFrame(enc_df.encoded_res.str.split(', ').tolist(),
-                          columns=col2)
-
-    # Remove the blank column
-    res_df = res_df.iloc[:, :-1]
 
-    # Add column containing pdb codes to the table of encoded residues
-    encoded_df = pd.concat([pdb_code_df, res_df], axis=1)
+    # Table of encoded residues, indexed by pdb code. Positions that no pdb file has a residue for are added as
+    # empty columns in the same step
+    encoded_df = res_df.reindex(columns=col2)
 
-    col3 = ['code', 'angle']
+    # Angle column will be added to the table of encoded residues by matching the pdb code index of both tables
+    # to make sure all the data is for the right pdb file, then the pdb code is made a column again. Only pdb
+    # files that have both encoded residues and an angle are kept
+    training_df = encoded_df.join(angle_file, how="inner").reset_index()
 
-    # Take the second input from the commandline (which will be the table of pdb codes and their packing angles)
-    if sys.argv[2] != '':
-        angle_file = pd.read_csv(sys.argv[2], usecols=col3)
-
-    # Angle column will be added to the table of encoded residues and the table is sorted by code
-    # to make sure all the data is for the right pdb file
-    training_df = pd.merge(encoded_df, angle_file, how="right", on=["code"], sort=True)
-
-    # remove all rows that contain blank spaces
-    nan_value = float('NaN')
-    training_df.replace('', nan_value, inplace=True)
+    # remove all rows that are missing an encoded residue or an angle (the encoded columns are numeric, so blanks
+    # are already read in as NaN)
     training_df.dropna(axis=0, how='any', inplace=True)
 
     return training_df
@@ -258,14 +212,11 @@ def combine_by_pdb_code(table):
 # *************************************************************************
 
 read_file = read_csv()
+angles = read_angles()
 # print(read_file)
 
-res_seq = make_res_seq(read_file)
-#print(res_seq)
-
-
-parameters = encode(res_seq)
+parameters = encode(read_file)
 # print(parameters.groupby(['code']))
 
-results = combine_by_pdb_code(parameters)
+results = combine_by_pdb_code(parameters, angles)
 results.to_csv('{}.csv'.format(sys.argv[4]), index=False)
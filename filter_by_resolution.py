@@ -66,10 +66,11 @@ def read_directory_for_pdb_files(pdb_direct):
     for structure_file in files:
         with open(structure_file) as text_file:
 
-            # Search for lines that contain 'REMARK 950 RESOLUTION' and add to reso_lines list
-            for line in text_file.read().split('\n'):
-                if str(line).strip().startswith('REMARK 950 METHOD     X-ray'):
+            # Search for the line that contains 'REMARK 950 METHOD     X-ray', stopping at the first one found
+            for line in text_file:
+                if line.startswith('REMARK 950 METHOD     X-ray'):
                     xray_files.append(structure_file)
+                    break
     return xray_files
 
 
@@ -96,8 +97,8 @@ def read_pdbfiles_as_lines(files):
             structure_file = structure_file[:-4]
 
             # Search for lines that contain 'REMARK 950 RESOLUTION' and add to reso_lines list
-            for line in text_file.read().split('\n'):
-                if str(line).strip().startswith('REMARK 950 RESOLUTION'):
+            for line in text_file:
+                if line.startswith('REMARK 950 RESOLUTION'):
                     reso_lines.append(line[22:])
 
             # Associate the name of the file with the relevant lines in a dictionary
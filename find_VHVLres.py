@@ -26,12 +26,27 @@ Commandline inputs: 1) directory path for where the .pdb files are stored
 # *************************************************************************
 # Import libraries
 
-# sys to take args from commandline, os for reading directory, and pandas for building dataframes
+# sys to take args from commandline, os for reading directory, concurrent.futures for reading several PDB files
+# at once, numpy for slicing PDB columns, and pandas for building dataframes
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 
 
+# Three-letter to one-letter residue codes
+three_to_one_dic = {'CYS': 'C', 'ASP': 'D', 'SER': 'S', 'GLN': 'Q', 'LYS': 'K', 'ILE': 'I', 'PRO': 'P', 'THR': 'T',
+                    'PHE': 'F', 'ASN': 'N', 'GLY': 'G', 'HIS': 'H', 'LEU': 'L', 'ARG': 'R', 'TRP': 'W', 'ALA': 'A',
+                    'VAL': 'V', 'GLU': 'E', 'TYR': 'Y', 'MET': 'M', 'XAA': 'X', 'UNK': 'X'}
+
+# Residue positions relevant for VH-VL packing
+vhvl_positions = ['L38', 'L40', 'L41', 'L44', 'L46', 'L87', 'H33', 'H42', 'H45', 'H60', 'H62', 'H91', 'H105']
+
+# The same positions as bytes, for matching against the raw columns of PDB files
+vhvl_position_ids = np.array([position.encode() for position in vhvl_positions])
+
+
 # *************************************************************************
 def get_pdbdirectory():
     """Read the directory name from the commandline argument
@@ -49,151 +64,134 @@ def get_pdbdirectory():
     return pdb_direct
 
 
-# *************************************************************************
-def extract_pdb_name(directory):
-    """Return a list of headers of PDB files in the called directory
-
-    Input:  directory    --- Directory of PBD files that will be processed for VH-VL packing angles
-    Return: pdb_names    --- Names of all PDB files in the directory
-    e.g. ['5DMG_2', '5DQ9_3']
-
-    18.03.2021  Original   By: VAB
-    """
-
-    # Iterates over all files in directory, checks if they are pdb files and returns the
-    # name without the extension into a list.
-    pdb_names = []
-    for pdb in os.listdir(directory):
-        if pdb.endswith(".pdb") or pdb.endswith(".ent"):
-            pdb_name = os.path.splitext(pdb)[0]
-            pdb_names.append(pdb_name)
-    return pdb_names
-
-
 # *************************************************************************
 def read_directory_for_pdb_files(directory):
-    """Return a list of all files that are PDB files in the called directory with full filepath
+    """Return the name and the full filepath of all files that are PDB files in the called directory
 
     Input:  directory    --- Directory of PBD files that will be processed for VH-VL packing angles
-    Return: files        --- All PDB files in the directory
-    e.g. ['/Users/v/Desktop/git/VH_VL_Pack/some_pdbs/5DMG_2.pdb',
-     '/Users/v/Desktop/git/VH_VL_Pack/some_pdbs/5DQ9_3.pdb']
+    Return: files        --- Name and path of all PDB files in the directory
+    e.g. [('5DMG_2', '/Users/v/Desktop/git/VH_VL_Pack/some_pdbs/5DMG_2.pdb'),
+     ('5DQ9_3', '/Users/v/Desktop/git/VH_VL_Pack/some_pdbs/5DQ9_3.pdb')]
 
     15.03.2021  Original   By: VAB
     """
 
-    # Creates an empty list, then iterates over all files in the directory called from the
-    # commandline. Adds all these .pdb  and .ent files to the list.
-    files = []
-    for file in os.listdir(directory):
-        if file.endswith(".pdb") or file.endswith(".ent"):
-
-            # Prepends the directory path to the front of the file name to create full filepath
-            files.append('{}/{}'.format(directory, file))
+    # Walks the directory called from the commandline once, keeping all .pdb and .ent files together with their
+    # name without the extension
+    with os.scandir(directory) as entries:
+        files = [(entry.name[:-4], entry.path) for entry in entries if entry.name.endswith((".pdb", ".ent"))]
     return files
 
 
 # *************************************************************************
-def read_pdbfiles_as_lines(files):
-    """Read PDB files as lines, then make a dictionary of the PDB code and all the lines that start with 'ATOM'
+def read_pdbfile_residues(structure_file):
+    """Read a single PDB file as lines and take the residue details from the first line that starts with 'ATOM'
+    for each residue at the VH-VL packing positions
 
-    Input:  files       --- Paths to all PDB files present in the directory
-    Return: pdb_dict    --- Dictionary of PDB names with all of the lines containing atom details
-    e.g.
-{'5DMG_2': ['ATOM   4615  N   GLN L   2     -34.713  12.044 -12.438  1.00 44.10         N  ',...'], '5DQ9_3':...'}
+    Input:  structure_file  --- Path to a PDB file
+    Return: residues        --- Chain, three-letter residue name and residue number of each relevant residue
+    e.g. [('L', 'GLN', '38'), ('L', 'PRO', '40'), ...]
 
-    10.03.2021  Original   By: VAB
+    15.10.2026  Original   By: agent
     """
 
-    pdb_dict = {}
+    # Read the whole file as an array of bytes. A short run of spaces is added to the end so that the fixed
+    # columns of the last line can always be read
+    with open(structure_file, "rb") as pdb_file:
+        pdb_bytes = np.frombuffer(pdb_file.read() + b' ' * 27, dtype=np.uint8)
 
-    for structure_file in files:
-        atom_lines = []
-        with open(structure_file, "r") as text_file:
+    # Every line starts after a newline. The first 27 columns of each line are gathered into one row of a 2-D
+    # array so the ATOM records are found and their columns sliced with NumPy instead of a loop over the lines
+    line_starts = np.flatnonzero(pdb_bytes[:-27] == ord('\n')) + 1
+    line_starts = np.concatenate(([0], line_starts[line_starts < pdb_bytes.size - 27]))
+    columns = pdb_bytes[line_starts[:, np.newaxis] + np.arange(27)]
+    atoms = columns[(columns[:, :4] == np.frombuffer(b'ATOM', dtype=np.uint8)).all(axis=1)]
 
-            # Remove the path and the extension from the name of the PDB file
-            structure_file = structure_file.replace('{}/'.format(pdb_directory), '')
-            structure_file = structure_file[:-4]
+    # Chain (column 22) and residue number with insertion code (columns 23-27) give the position, e.g. L38
+    chains = np.ascontiguousarray(atoms[:, 21:22]).view('S1').ravel()
+    res_nums = np.char.strip(np.ascontiguousarray(atoms[:, 22:27]).view('S5').ravel())
+    positions = np.char.add(chains, res_nums)
 
-            # Search for lines that contain 'ATOM' and add to atom_lines list
-            for line in text_file.read().split('\n'):
-                if str(line).strip().startswith('ATOM'):
-                    atom_lines.append(line)
+    # Every atom of a residue gives the same residue details, so only the first line for each position is used,
+    # and residues outside the VH-VL packing positions are dropped
+    unique_positions, first_lines = np.unique(positions, return_index=True)
+    first_lines = np.sort(first_lines[np.isin(unique_positions, vhvl_position_ids)])
 
-            # Associate the name of the file with the relevant lines in a dictionary
-            pdb_dict[structure_file] = atom_lines
+    # Take the residue name from columns 18-20 of the remaining lines
+    res_names = np.char.strip(np.ascontiguousarray(atoms[first_lines, 17:20]).view('S3').ravel())
+    residues = [(chain.decode(), res_name.decode(), res_num.decode())
+                for chain, res_name, res_num in zip(chains[first_lines], res_names, res_nums[first_lines])]
 
-    return pdb_dict
+    return residues
 
 
 # *************************************************************************
-def one_letter_code(pdb, res):
+def read_pdbfiles_residues(files):
+    """Read PDB files as lines and give the details of each residue at the VH-VL packing positions, one at a time
 
-    """
-    Go from the three-letter code to the one-letter code.
-
-    Input:  residue      --- Three-letter residue identifier
-    Return: one_letter   --- The one-letter residue identifier
+    Input:  files       --- Names and paths of all PDB files present in the directory
+    Return: generator of the PDB name, chain, three-letter residue name and residue number of each relevant residue
+    e.g. ('5DMG_2', 'L', 'GLN', '38'), ('5DMG_2', 'L', 'PRO', '40'), ...
 
-    20.10.2020  Original   By: LD
+    15.10.2026  Original   By: agent
     """
 
-    dic = {'CYS': 'C', 'ASP': 'D', 'SER': 'S', 'GLN': 'Q', 'LYS': 'K', 'ILE': 'I', 'PRO': 'P', 'THR': 'T', 'PHE': 'F',
-           'ASN': 'N', 'GLY': 'G', 'HIS': 'H', 'LEU': 'L', 'ARG': 'R', 'TRP': 'W', 'ALA': 'A', 'VAL': 'V', 'GLU': 'E',
-           'TYR': 'Y', 'MET': 'M', 'XAA': 'X', 'UNK': 'X'}
-    if res not in dic:
-        raise ValueError("{}: {} not in dic".format(pdb, res))
+    pdb_codes = [pdb_code for pdb_code, structure_file in files]
+    structure_files = [structure_file for pdb_code, structure_file in files]
 
-    one_letter = dic[res]
-    return one_letter
+    # Each file is independent, so they are read in separate processes across all of the cores. The residues of
+    # each file are passed on as soon as they come back, without keeping the lines of the file
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for pdb_code, residues in zip(pdb_codes,
+                                      executor.map(read_pdbfile_residues, structure_files, chunksize=16)):
+            for chain, residue, res_num in residues:
+                yield pdb_code, chain, residue, res_num
 
 
 # *************************************************************************
-def prep_table(dictionary):
+def prep_table(residue_details):
     """Build table for atom information using pandas dataframes
 
-    Input:  dict_list      --- Dictionary of PDB codes associated with 'ATOM' lines
-    Return: ftable         --- Sorted table that contains the details needed to search for the relevant residues:
+    Input:  residue_details  --- PDB code, chain, three-letter residue name and residue number of each residue
+    Return: ftable           --- Sorted table that contains the details needed to search for the relevant residues:
     e.g.
       PDB Code chain residue number L/H position
-0       5DMG_2     L       Q      2           L2
-9       5DMG_2     L       V      3           L3
-16      5DMG_2     L       L      4           L4
+0       5DMG_2     L       Q     38          L38
+1       5DMG_2     L       P     40          L40
+2       5DMG_2     L       G     41          L41
 
     10.03.2021  Original   By: VAB
     26.03.2021  V2.0       By: VAB
     """
 
-    table = []
-
     # Assign column names for residue table
     c = ['code', 'chain', "residue", 'number', 'L/H position']
 
-    # Locate specific residue information
-    for key, value in dictionary.items():
-        pdb_code = key
-        for data in value:
-            items = data.split()
-            res_num = items[5]
-            chain = items[4]
-            residue = items[3]
-
-            # Use defined dictionary to convert 3-letter res code to 1-letter
-            try:
-                res_one = str(one_letter_code(key, residue))
-            except ValueError:
-                continue
-
-            # Create a column that reads the light/ heavy chain residue location e.g. L38 (for easy search)
-            lhposition = str("{}{}".format(chain, res_num))
-            res_info = [pdb_code, chain, res_one, res_num, lhposition]
-            table.append(res_info)
-
-    # Use pandas to build a data table from compiled residue info and column headers:
-    ftable = pd.DataFrame(data=table, columns=c)
-
-    # Remove all row duplicates
-    ftable = ftable.drop_duplicates()
+    codes = []
+    chains = []
+    residues = []
+    numbers = []
+
+    # Each detail is collected in its own column list so the table is built column by column in one step
+    for pdb_code, chain, residue, res_num in residue_details:
+        codes.append(pdb_code)
+        chains.append(chain)
+        residues.append(residue)
+        numbers.append(res_num)
+
+    ftable = pd.DataFrame({'code': codes, 'chain': chains, 'residue': residues, 'number': numbers})
+
+    # Create a column that reads the light/ heavy chain residue location e.g. L38 (for easy search). Only lines
+    # for the VH-VL packing positions were read, so positions and pdb codes repeat across the table and are stored
+    # as categories (small integer codes) for the later filtering
+    ftable['L/H position'] = pd.Categorical(ftable['chain'] + ftable['number'], categories=vhvl_positions)
+    ftable['code'] = ftable['code'].astype('category')
+
+    # Use defined dictionary to convert 3-letter res code to 1-letter, dropping residues that are not in it
+    ftable = ftable.assign(residue=ftable['residue'].map(three_to_one_dic)).dropna(subset=['residue'])
+
+    # Each residue is only read once, so there are no duplicate rows to remove
+    ftable = ftable[c]
     return ftable
 
 
@@ -208,7 +206,7 @@ def vh_vl_relevant_residues(vtable):
     """
 
     # Look for rows that contain the specified residue locations
-    vtable = vtable[vtable['L/H position'].str.contains('L38|L40|L41|L44|L46|L87|H33|H42|H45|H60|H62|H91|H105')]
+    vtable = vtable[vtable['L/H position'].isin(vhvl_positions)]
 
     # Create a table of the residue data for the specific locations
     out_table = vtable.loc[:, ('code', 'L/H position', 'residue')]
@@ -219,17 +217,18 @@ def vh_vl_relevant_residues(vtable):
 # *** Main program                                                      ***
 # *************************************************************************
 
-pdb_directory = get_pdbdirectory()
-
-generate_pdb_names = extract_pdb_name(pdb_directory)
+# The main program only runs when the script is called, so that the processes that read the PDB files can
+# import this module
+if __name__ == '__main__':
+    pdb_directory = get_pdbdirectory()
 
-pdb_files = read_directory_for_pdb_files(pdb_directory)
+    pdb_files = read_directory_for_pdb_files(pdb_directory)
 
-pdb_lines = read_pdbfiles_as_lines(pdb_files)
+    pdb_residues = read_pdbfiles_residues(pdb_files)
 
-init_table = prep_table(pdb_lines)
+    init_table = prep_table(pdb_residues)
 
-VHVLtable = vh_vl_relevant_residues(init_table)
+    VHVLtable = vh_vl_relevant_residues(init_table)
 
-# index= FALSE removes indexing column from the dataframe
-VHVLtable.to_csv('{}.csv'.format(sys.argv[2]), index=False)
+    # index= FALSE removes indexing column from the dataframe
+    VHVLtable.to_csv('{}.csv'.format(sys.argv[2]), index=False)
@@ -47,13 +47,14 @@ def find_files(od, nd):
         print("Creation of the directory %s failed" % path)
     else:
         print("Successfully created the directory %s " % path)
+    # Collect the upper case pdb codes of the old files once
     for file in os.listdir(od):
-        o_files.append(file[:4])
-        o_files = [x.upper() for x in o_files]
-        for item in o_files:
-            for pdb in os.listdir(nd):
-                if item in str(pdb):
-                    shutil.copy(os.path.join(sys.argv[2], '{}'.format(pdb)), path)
+        o_files.append(file[:4].upper())
+
+    # List the new directory once and copy each file whose name contains one of the old pdb codes
+    for pdb in os.listdir(nd):
+        if any(item in pdb for item in o_files):
+            shutil.copy(os.path.join(sys.argv[2], '{}'.format(pdb)), path)
     return
 
 
@@ -42,7 +42,7 @@ def read():
 
     # remove lines that don't contain angles
     try:
-        res_file = res_file[res_file['angle'].str.contains('Packing angle') == False]
+        res_file = res_file[res_file['angle'].str.contains('Packing angle', regex=False) == False]
     except:
         print('No missing angles.')
 
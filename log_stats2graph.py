@@ -50,8 +50,6 @@ def stats_to_df():
 
     all_data = []
     files = []
-    out_data = []
-    normal_data = []
 
     # Open the directory and make a list of .log files that are in there
     for file in os.listdir(direct):
@@ -75,38 +73,36 @@ def stats_to_df():
                     all = [code, angle, pred, error]
                     all_data.append(all)
 
-                    # Find files that are out of the normal range and will be considered outliers
-                    if not -48 < int(pred) < -42:
-                        out = [code, angle, pred, error]
-                        out_data.append(out)
-                    else:
-                        normal = [code, angle, pred, error]
-                        normal_data.append(normal)
-
     # Make .csv files for all of the data, splitting it into files that have all the data, only outliers, and only the
     # data withing the 'norm'
     df_a = pd.DataFrame(data=all_data, columns=col)
+
+    # Find files that are out of the normal range and will be considered outliers. The predictions are truncated
+    # towards zero, as int() does, before comparing them to the range
+    normal = df_a['predicted'].astype(int).between(-48, -42, inclusive='neither')
+    df_o = df_a[~normal].reset_index(drop=True)
+    df_n = df_a[normal].reset_index(drop=True)
+
     df_a.to_csv('all_{}.csv'.format(sys.argv[2]), index=False)
+    df_o.to_csv('outlier_{}.csv'.format(sys.argv[2]), index=False)
+    df_n.to_csv('normal_{}.csv'.format(sys.argv[2]), index=False)
+
+    # Calculate the Root Mean Square Error. The squared errors are found once for the whole dataset and the outliers
+    # take theirs from the same column
+    sqerror = np.square(df_a['error'])
+    df_a['sqerror'] = sqerror
+    df_o['sqerror'] = sqerror[~normal].to_numpy()
 
-    # Calculate the Root Mean Square Error
-    df_a['sqerror'] = np.square(df_a['error'])
     sum_sqerror = float(df_a['sqerror'].sum())
     average_error = sum_sqerror / int(df_a['code'].size)
     RMSE = str(math.sqrt(average_error))
     print('All RMSE:', RMSE)
 
-    df_o = pd.DataFrame(data=out_data, columns=col)
-    df_o.to_csv('outlier_{}.csv'.format(sys.argv[2]), index=False)
-
-    df_o['sqerror'] = np.square(df_o['error'])
     sum_sqerror_o = float(df_o['sqerror'].sum())
     average_error_o = sum_sqerror_o/int(df_o['code'].size)
     RMSE_o = str(math.sqrt(average_error_o))
     print('Outlier RMSE:', RMSE_o)
 
-    df_n = pd.DataFrame(data=normal_data, columns=col)
-    df_n.to_csv('normal_{}.csv'.format(sys.argv[2]), index=False)
-
     # Call the RELRMSE.py script which converts the RMSE into Relative RMSE
     RELRMSE = subprocess.check_output(['python3', 'RELRMSE.py', 'all_{}.csv'.format(sys.argv[2]), 'graph.dat', RMSE])
     RELRMSE_o = subprocess.check_output(['python3', 'RELRMSE.py', 'all_{}.csv'.format(sys.argv[2]),
@@ -142,11 +138,7 @@ def plot_scatter(file_o, RELRMSE_o, file_n, file_a, RELRMSE_a):
     # Color of best fit line for full set
     c4 = 'teal'
 
-    # Angle values are converted into float format
-    file_o['angle'] = file_o['angle'].apply(lambda x: float(x))
-    file_o['predicted'] = file_o['predicted'].apply(lambda y: float(y))
-
-    # Angle values are designated axis names
+    # Angle values are designated axis names. They were read as floats from the log files, so no conversion is needed
     x1 = file_o['angle']
     y1 = file_o['predicted']
 
@@ -154,13 +146,9 @@ def plot_scatter(file_o, RELRMSE_o, file_n, file_a, RELRMSE_a):
     m1, b1 = np.polyfit(x1, y1, 1)
     plt.plot(x1, m1 * x1 + b1, color=c3, linestyle='dashed', linewidth=1)
 
-    file_n['angle'] = file_n['angle'].apply(lambda x: float(x))
-    file_n['predicted'] = file_n['predicted'].apply(lambda y: float(y))
     x2 = file_n['angle']
     y2 = file_n['predicted']
 
-    file_a['angle'] = file_a['angle'].apply(lambda x: float(x))
-    file_a['predicted'] = file_a['predicted'].apply(lambda y: float(y))
     x3 = file_a['angle']
     y3 = file_a['predicted']
 
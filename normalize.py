@@ -46,7 +46,7 @@ def read_file():
 
     # remove lines that don't contain angles
     try:
-        res_file = res_file[res_file['angle'].str.contains('Packing angle') == False]
+        res_file = res_file[res_file['angle'].str.contains('Packing angle', regex=False) == False]
     except:
         print('No missing angles.')
 
@@ -65,9 +65,7 @@ def normalize(data):
     norm_angle = []
     max_angle = (data['angle']).astype(float).max()
     min_angle = (data['angle']).astype(float).min()
-    print(min_angle)
     range_angle = max_angle - min_angle
-    print(range_angle)
 
     for angle in data['angle']:
         normalized = (float(angle) / range_angle) - (min_angle / range_angle)
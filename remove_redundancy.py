@@ -47,7 +47,7 @@ def remove_duplicates():
 
     # remove lines that don't contain angles
     try:
-        res_file = res_file[res_file['angle'].str.contains('Packing angle') == False]
+        res_file = res_file[res_file['angle'].str.contains('Packing angle', regex=False) == False]
     except:
         print('No missing angles.')
 